@@ -8,13 +8,18 @@ import socket
 import subprocess
 import logging
 import sys
-import time
 import os
 import atexit
 import signal
-import json
+import struct
 from pathlib import Path
 
+# Binary layout of a stats update: magic, frames_shown, total_frames,
+# frames_buffered, data_throughput, playback_speed.
+# The leading NUL byte keeps it distinguishable from the plain text log lines sent to the same port.
+STATS_MAGIC = b'\x00TVS'
+STATS_PACKET = struct.Struct('<4siiddd')
+
 class TerminalLogHandler(logging.Handler):
     """Custom handler that sends plain text logs via UDP"""
     
@@ -44,6 +49,7 @@ class DaemonManager:
         self.logger = None
         self.terminal_handler = None
         self.daemon_sock = None
+        self.daemon_address = ('127.0.0.1', port)
         self.is_initialized = False
         
         if start_daemon:
@@ -173,7 +179,7 @@ class DaemonManager:
         
         sys.stderr = StderrToLogger(self.logger, logging.ERROR)
     
-    def update_daemon(self, frames_shown: int, total_frames: int, frames_buffered: float, 
+    def update_daemon(self, frames_shown: int, total_frames: int, frames_buffered: int, 
                       data_throughput: float, playback_speed: float):
         """
         Send a status update to the daemon terminal.
@@ -188,15 +194,9 @@ class DaemonManager:
         if self.daemon_sock is None:
             return
         try:
-            msg_dict = {
-                'frames_shown': frames_shown,
-                'total_frames': total_frames,
-                'frames_buffered': frames_buffered,
-                'data_throughput': data_throughput,
-                'playback_speed': playback_speed
-            }
-            json_msg = json.dumps(msg_dict)
-            self.daemon_sock.sendto(json_msg.encode('utf-8'), ('127.0.0.1', self.port))
+            packet = STATS_PACKET.pack(STATS_MAGIC, frames_shown, total_frames,
+                                       frames_buffered, data_throughput, playback_speed)
+            self.daemon_sock.sendto(packet, self.daemon_address)
         except Exception:
             pass  # Silently ignore if daemon is not available
         
@@ -217,8 +217,9 @@ class DaemonManager:
             try:
                 if sys.platform == 'win32':
                     self.daemon_process.terminate()
-                    time.sleep(0.5)
-                    if self.daemon_process.poll() is None:
+                    try:
+                        self.daemon_process.wait(timeout=0.5)
+                    except subprocess.TimeoutExpired:
                         self.daemon_process.kill()
                 else:
                     self.daemon_process.terminate()
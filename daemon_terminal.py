@@ -7,12 +7,13 @@ import socket
 import sys
 import argparse
 import os
+import signal
 import time
 import threading
-import json
 from blessed import Terminal
 
 from terminal_api import clear_and_print_at, hide_cursor
+from daemon_helper import STATS_MAGIC, STATS_PACKET
 
 class LogReceiverDaemon:
     def __init__(self, port=9999, host='127.0.0.1', parent_pid=None):
@@ -22,6 +23,11 @@ class LogReceiverDaemon:
         self.sock = None
         self.running = True
         self.term = Terminal()
+        # Each blessed width/height access queries the tty, so cache the size and refresh it on resize
+        self.term_width = self.term.width
+        self.term_height = self.term.height
+        if sys.platform != 'win32':
+            signal.signal(signal.SIGWINCH, self._on_resize)
         self.daemon_stats = {
             'frames_shown': 0,
             'total_frames': 0,
@@ -31,6 +37,11 @@ class LogReceiverDaemon:
         }
         hide_cursor()
         
+    def _on_resize(self, signum, frame):
+        """Refresh the cached terminal size"""
+        self.term_width = self.term.width
+        self.term_height = self.term.height
+        
     def check_parent_alive(self):
         """Check if parent process is still running"""
         if self.parent_pid is None:
@@ -92,14 +103,14 @@ class LogReceiverDaemon:
         progress_bar = self.create_progress_bar()
 
         # Position progress bar at the bottom of the terminal
-        final_output = stats_text + self.term.move(self.term.height - 1, 0) + progress_bar
+        final_output = stats_text + self.term.move(self.term_height - 1, 0) + progress_bar
 
         # Print the combined string in one go
         clear_and_print_at(self.term, (0, 0), final_output)
     
     def create_progress_bar(self):
         """Create a progress bar spanning the entire terminal width"""
-        terminal_width = self.term.width
+        terminal_width = self.term_width
         frames_shown = self.daemon_stats['frames_shown']
         total_frames = self.daemon_stats['total_frames']
         
@@ -134,18 +145,20 @@ class LogReceiverDaemon:
         
         return progress_bar
     
-    def parse_message(self, message: str):
-        """Parse incoming message - could be JSON stats or regular log"""
-        try:
-            # Try to parse as JSON first
-            data = json.loads(message)
-            if all(key in data for key in ['frames_shown', 'total_frames', 'frames_buffered', 'data_throughput', 'playback_speed']):
-                # This is a daemon stats message
-                self.daemon_stats = data
-                self.display_stats()
-                return
-        except (json.JSONDecodeError, ValueError):
-            pass
+    def parse_message(self, data: bytes):
+        """Parse incoming message - could be binary stats or regular log"""
+        if len(data) == STATS_PACKET.size and data.startswith(STATS_MAGIC):
+            # This is a daemon stats message
+            _, frames_shown, total_frames, frames_buffered, data_throughput, playback_speed = STATS_PACKET.unpack(data)
+            self.daemon_stats = {
+                'frames_shown': frames_shown,
+                'total_frames': total_frames,
+                'frames_buffered': frames_buffered,
+                'data_throughput': data_throughput,
+                'playback_speed': playback_speed
+            }
+            self.display_stats()
+            return
 
         sys.stdout.flush()
         
@@ -162,8 +175,7 @@ class LogReceiverDaemon:
             while self.running:
                 try:
                     data, addr = self.sock.recvfrom(4096)
-                    message = data.decode('utf-8')
-                    self.parse_message(message)
+                    self.parse_message(data)
                 except socket.timeout:
                     continue  # Check if still running
                 except Exception:
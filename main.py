@@ -3,6 +3,7 @@ import cProfile
 import logging
 import time
 import os
+from concurrent.futures import ThreadPoolExecutor
 
 from blessed import Terminal
 from ffpyplayer.player import MediaPlayer
@@ -14,51 +15,78 @@ import ffmpeg
 
 terminal = Terminal()
 
+# Rate at which stats are sent to the debug daemon, in updates per second.
+# The stats panel is read by a human and does not need every frame.
+DAEMON_UPDATE_RATE = 10
+
 if os.name == 'nt':
     os.system('chcp 65001 >nul')
 
-def _play_video(file_path: str, size: int = 32, debug_mode: bool = False, muted: bool = False, compression: int = 150):
+def _open_audio_player(file_path: str):
+    """Returns a paused MediaPlayer for the file's audio, or None if it has no audio stream."""
+    probe = ffmpeg.probe(file_path)
+    audio_streams = [stream for stream in probe['streams'] if stream['codec_type'] == 'audio']
+    if not audio_streams:
+        return None
+    return MediaPlayer(file_path, ff_opts={'vn': True, 'sn': True, 'paused': True}, loglevel='quiet')
+
+def _play_video(file_path: str, size: int = 32, debug_mode: bool = False, muted: bool = False, compression: int = 150, palette_256: bool = False):
     decoder = video_decoder.VideoDecoder(
         file_path,
         size,
-        compression
+        compression,
+        palette_256
     )
     
-    probe = ffmpeg.probe(file_path)
-    audio_streams = [stream for stream in probe['streams'] if stream['codec_type'] == 'audio']
-    
-    muted = not (len(audio_streams) > 0 and not muted)
-
-    player = None
-    if not muted:
-        player = MediaPlayer(file_path, ff_opts={'vn': True, 'sn': True}, loglevel='quiet')
-
     diff_generator = decoder.diff_frame_generator()
 
     frame_rate = decoder.get_frame_rate()
     frame_amount = decoder.get_total_frames()
     frame_time = 1.0 / frame_rate
+    # Integer nanoseconds for the wall-clock timeline, avoids float drift over long videos
+    frame_time_ns = round(1e9 / frame_rate)
+    daemon_stride = max(1, int(frame_rate / DAEMON_UPDATE_RATE))
     
     # Track pause state to avoid spamming the player
     is_paused = False
 
-    # Start the generator
-    try:
-        frame = next(diff_generator)
-    except StopIteration:
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        # Probe and open the audio while the producer process starts up and decodes the first frame.
+        # The player starts paused so audio does not run ahead of the first frame.
+        player_future = None if muted else executor.submit(_open_audio_player, file_path)
+
+        # Start the generator
+        try:
+            frame = next(diff_generator)
+        except StopIteration:
+            frame = None
+        except BaseException:
+            # The loop below never runs, so close the player here once it has been opened
+            if player_future is not None and player_future.exception() is None:
+                opened_player = player_future.result()
+                if opened_player:
+                    opened_player.close_player()
+            raise
+
+        player = player_future.result() if player_future is not None else None
+
+    if frame is None:
         if player:
             player.close_player()
         return
 
+    if player:
+        player.set_pause(False)
+
     frame_idx = 0
     
     # Track start time for wall-clock fallback
     # Moved here so we don't count the time it took to load the first frame as "lag"
-    start_time = time.time()
+    start_ns = time.perf_counter_ns()
 
     try:
         while True:
-            frame_start_time = time.time()
+            frame_start_ns = time.perf_counter_ns()
 
             # Render the current frame
             terminal_api.print_at_bytes((0, 0), frame)
@@ -96,26 +124,26 @@ def _play_video(file_path: str, size: int = 32, debug_mode: bool = False, muted:
                         is_paused = False
             else:
                 # Fallback: Audio not ready yet or finished. Sync to wall clock.
-                target_time = start_time + (frame_idx * frame_time)
-                current_time = time.time()
-                sleep_time = target_time - current_time
-                if sleep_time > 0.005:
-                    time.sleep(sleep_time)
-                elif sleep_time < -0.2:
+                target_ns = start_ns + frame_idx * frame_time_ns
+                current_ns = time.perf_counter_ns()
+                sleep_ns = target_ns - current_ns
+                if sleep_ns > 5_000_000:
+                    time.sleep(sleep_ns / 1e9)
+                elif sleep_ns < -200_000_000:
                     # We are behind by more than 200ms. 
                     # Instead of fast-forwarding to catch up, we reset the timeline.
                     # This effectively "drops" the time we lost.
-                    start_time = current_time - (frame_idx * frame_time)
+                    start_ns = current_ns - frame_idx * frame_time_ns
 
-            if debug_mode and daemon_helper.daemon_manager:
-                frame_end_time = time.time()
+            if debug_mode and daemon_helper.daemon_manager and frame_idx % daemon_stride == 0:
+                frame_elapsed_ns = time.perf_counter_ns() - frame_start_ns
                 # Calculate stats
                 daemon_helper.daemon_manager.update_daemon(
                     frames_shown=frame_idx,
                     total_frames=frame_amount,
                     frames_buffered=decoder.get_buffered_frame_count(),
                     data_throughput=len(frame) / 1024,
-                    playback_speed= 1.0 / (frame_end_time - frame_start_time) / frame_rate
+                    playback_speed=frame_time_ns / frame_elapsed_ns
                 )
     finally:
         # Mute immediately to stop any buffered audio from playing
@@ -124,7 +152,7 @@ def _play_video(file_path: str, size: int = 32, debug_mode: bool = False, muted:
             player.set_pause(True)
             player.close_player()
 
-def play_video(file_path: str, size: int = 32, debug_mode: bool = False, muted: bool = False, compression: int = 150):
+def play_video(file_path: str, size: int = 32, debug_mode: bool = False, muted: bool = False, compression: int = 150, palette_256: bool = False):
     terminal_api.clear_screen(terminal)
     terminal_api.hide_cursor()
     
@@ -134,7 +162,7 @@ def play_video(file_path: str, size: int = 32, debug_mode: bool = False, muted:
         logging.getLogger().setLevel(logging.ERROR)
     
     try:    
-        _play_video(file_path, size, debug_mode, muted, compression)
+        _play_video(file_path, size, debug_mode, muted, compression, palette_256)
 
     except KeyboardInterrupt:
         pass
@@ -159,9 +187,10 @@ if __name__ == "__main__":
     parser.add_argument("--debug", action="store_true", help="Open debug terminal and run with profiler.")
     parser.add_argument("--muted", action="store_true", help="Mute the audio.")
     parser.add_argument("--compression", type=int, default=150, help="The threshold for color change detection (default: 150).")
+    parser.add_argument("--256color", dest="palette_256", action="store_true", help="Use the 256-color palette instead of truecolor. Smaller output, lower color fidelity.")
     args = parser.parse_args()
 
     if args.debug:
-        cProfile.run('play_video(args.file_path, args.size, args.debug, args.muted, args.compression)')
+        cProfile.run('play_video(args.file_path, args.size, args.debug, args.muted, args.compression, args.palette_256)')
     else:
-        play_video(args.file_path, args.size, args.debug, args.muted, args.compression)
+        play_video(args.file_path, args.size, args.debug, args.muted, args.compression, args.palette_256)
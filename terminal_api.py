@@ -7,6 +7,9 @@ from blessed import Terminal
 if os.name == 'nt':
     os.system('chcp 65001 >nul')
 
+# Decimal ASCII bytes for every color channel value (0-255)
+DEC = [str(i).encode('ascii') for i in range(256)]
+
 def hide_cursor():
     """Hides the cursor in the terminal."""
     sys.stdout.write('\x1b[?25l')
@@ -34,8 +37,9 @@ def print_at(pos: tuple[int, int], text: str):
         pos (tuple[int, int]): A tuple (x, y) representing the position to print the text.
         text (str): The text to be printed at the specified position.
     """
-    sys.stdout.write(get_move_sequence((pos[0], pos[1])) + text)
-    sys.stdout.flush()
+    # Encode once and write to the binary buffer, bypassing the TextIOWrapper layer
+    sys.stdout.buffer.write((get_move_sequence((pos[0], pos[1])) + text).encode('utf-8'))
+    sys.stdout.buffer.flush()
 
 def write_all(fd, data):
     """
@@ -50,13 +54,37 @@ def write_all(fd, data):
         # Slice the data to remove the part that was just written
         data = data[bytes_written:]
 
+def writev_all(fd, buffers):
+    """
+    Robustly write several buffers to a file descriptor in scatter-gather syscalls, handling partial writes.
+    """
+    buffers = [memoryview(buffer).cast('B') for buffer in buffers]
+    while buffers:
+        # os.writev returns the total number of bytes written across all buffers
+        bytes_written = os.writev(fd, buffers)
+        if not bytes_written:
+            # Should not happen with stdout unless closed, but prevents infinite loop
+            break
+        # Drop the buffers that were written completely
+        while buffers and bytes_written >= len(buffers[0]):
+            bytes_written -= len(buffers[0])
+            buffers.pop(0)
+        # Continue from the middle of a partially written buffer
+        if bytes_written:
+            buffers[0] = buffers[0][bytes_written:]
+
 def print_at_bytes(pos: tuple[int, int], text: bytearray):
-    data = get_move_sequence_bytes(pos) + text
+    move_sequence = get_move_sequence_bytes(pos)
     try:
-        write_all(1, data)
+        if hasattr(os, 'writev'):
+            # Hand both buffers to one syscall instead of concatenating a copy of the whole frame
+            writev_all(1, (move_sequence, text))
+        else:
+            write_all(1, move_sequence + text)
     except OSError:
         # Fallback if raw descriptor fails
-        sys.stdout.buffer.write(data)
+        sys.stdout.buffer.write(move_sequence)
+        sys.stdout.buffer.write(text)
         sys.stdout.flush()
 
 def clear_and_print_at(terminal: Terminal, pos: tuple[int, int], text: str):
@@ -102,13 +130,31 @@ def get_rgb_front_and_back_sequence(fr: int, fg: int, fb: int, br: int, bg: int,
 @lru_cache(maxsize=4096)
 def get_move_sequence_bytes(target: tuple[int, int]) -> bytes:
     """Returns the terminal escape sequence as BYTES."""
-    # We build the string, then encode it. 
-    # Since this is cached, the encoding cost happens only once per position.
-    return f'\033[{target[1] + 1};{target[0] + 1}H'.encode('ascii')
+    # bytes %-formatting builds the sequence directly, without an intermediate str and encode.
+    return b'\033[%d;%dH' % (target[1] + 1, target[0] + 1)
+
+def build_move_table(width: int, height: int) -> list[list[bytes]]:
+    """Returns the cursor move sequences for a whole grid as BYTES, indexed as table[y][x].
+    
+    Args:
+        width: Number of columns in the grid.
+        height: Number of rows in the grid.
+    
+    Returns:
+        A list of rows, each holding the move sequence for every column in that row.
+    """
+    # Built directly instead of through get_move_sequence_bytes: a full grid is usually
+    # larger than its lru_cache, so routing it through the cache would only evict entries.
+    return [
+        [b'\033[%d;%dH' % (y + 1, x + 1) for x in range(width)]
+        for y in range(height)
+    ]
 
 @lru_cache(maxsize=4096)
 def get_rgb_front_and_back_sequence_bytes(fr: int, fg: int, fb: int, br: int, bg: int, bb: int) -> bytes:
     """Returns the terminal escape sequence as BYTES."""
-    # f-strings are faster than manual byte concatenation in Python 
-    # for this specific complexity level.
-    return f'\x1b[38;2;{fr};{fg};{fb}m\x1b[48;2;{br};{bg};{bb}m'.encode('ascii')
\ No newline at end of file
+    # Joining the pre-encoded channel digits avoids formatting any integers.
+    return b''.join((
+        b'\x1b[38;2;', DEC[fr], b';', DEC[fg], b';', DEC[fb],
+        b'm\x1b[48;2;', DEC[br], b';', DEC[bg], b';', DEC[bb], b'm'
+    ))
\ No newline at end of file
@@ -2,17 +2,22 @@ import cv2
 import numpy as np
 import multiprocessing
 from multiprocessing import shared_memory
-import time
-from terminal_api import get_move_sequence_bytes
+from terminal_api import build_move_table, DEC
 from constants import PERCEPTUAL_WEIGHT_BLUE, PERCEPTUAL_WEIGHT_GREEN, PERCEPTUAL_WEIGHT_RED
 
 # Pre-encode the block character to avoid doing it millions of times
 BLOCK_CHAR = '▀'.encode('utf-8')
 
+# Cursor movement needed before drawing a changed cell
+MOVE_NONE = 0      # Cell directly follows the previous one on the same row
+MOVE_NEWLINE = 1   # Cell is the first column of the row after the previous one
+MOVE_ABSOLUTE = 2  # Anything else needs a full cursor position sequence
+MOVE_FORWARD = 3   # Cell is further along the same row; skip the gap with a relative move
+
 def _video_producer_process(file_path: str, resolution: int, 
                           shm_name: str, buffer_size: int, 
                           free_queue: multiprocessing.Queue, ready_queue: multiprocessing.Queue,
-                          compression: int):
+                          compression: int, palette_256: bool):
     """
     Standalone function to run in a separate process.
     Decodes video and puts byte sequences into shared memory.
@@ -39,18 +44,28 @@ def _video_producer_process(file_path: str, resolution: int,
     # move_sequences[y][x]
     # We use h // 2 because we are rendering blocks (2 pixels high)
     rows_count = frame_height // 2
-    move_sequences = [
-        [get_move_sequence_bytes((x, y)) for x in range(frame_width)]
-        for y in range(rows_count + 1) # +1 buffer just in case
-    ]
+    move_sequences = build_move_table(frame_width, rows_count + 1) # +1 buffer just in case
+    # Cursor Forward sequences indexed by the number of cells to skip.
+    # Shorter than an absolute move for any gap on the same row.
+    forward_sequences = [b'\x1b[%dC' % n for n in range(frame_width + 1)]
 
     # Perceptual weights for BGR: Blue, Green, Red
     # This matches human eye perception (Luma) to prioritize Green/Brightness changes
     # and ignore subtle Blue/Red noise.
     perceptual_weights = np.array([PERCEPTUAL_WEIGHT_BLUE, PERCEPTUAL_WEIGHT_GREEN, PERCEPTUAL_WEIGHT_RED], dtype=np.int16)
 
+    # 256-color SGR sequences indexed by palette index.
+    # The palette is small and fixed, so every lookup in 256-color mode is a hit.
+    # Truecolor sequences are formatted on change instead: 24-bit video rarely repeats exact colors.
+    fg_palette_sequences = [b'\x1b[38;5;%dm' % i for i in range(256)]
+    bg_palette_sequences = [b'\x1b[48;5;%dm' % i for i in range(256)]
+
     prev_blocks = None
 
+    # Scratch array for the per-frame diff, shaped like blocks: (Rows//2, 2, Columns, 3).
+    # Allocated once and reused so the diff runs in place instead of creating temporaries.
+    diff_vals = np.empty((frame_height // 2, 2, frame_width, 3), dtype=np.int16)
+
     try:
         while True:
             ret, frame = cap.read()
@@ -63,8 +78,8 @@ def _video_producer_process(file_path: str, resolution: int,
 
             # Reshape into blocks: (Rows//2, 2_vertical_pixels, Columns, 3_colors)
             h, w, c = frame.shape
-            # Cast to int16 immediately to avoid repeated casting during diff and allow negative subtraction
-            blocks = frame.reshape(h // 2, 2, w, c).astype(np.int16)
+            # Colors stay uint8 (what the terminal displays); the diff widens to int16 on the fly
+            blocks = frame.reshape(h // 2, 2, w, c)
 
             current_prev_blocks = None
             change_mask = None
@@ -72,36 +87,80 @@ def _video_producer_process(file_path: str, resolution: int,
             if prev_blocks is None:
                 # Force full redraw for the first frame
                 change_mask = np.ones((h // 2, w), dtype=bool)
-                current_prev_blocks = blocks.copy()
+                # cv2.resize returns a fresh array every frame, so no copy is needed
+                current_prev_blocks = blocks
             else:
                 # Weighted Euclidean-ish Distance (Manhattan on weighted channels)
-                diff_vals = np.abs(blocks - prev_blocks)
-                weighted_diff = diff_vals * perceptual_weights
-                diff_score = np.sum(weighted_diff, axis=(1, 3))
+                np.subtract(blocks, prev_blocks, out=diff_vals, dtype=np.int16)
+                np.abs(diff_vals, out=diff_vals)
+                np.multiply(diff_vals, perceptual_weights, out=diff_vals)
+                diff_score = np.sum(diff_vals, axis=(1, 3))
                 
                 change_mask = diff_score > compression
 
-                # Calculate what the new state WOULD be, but don't commit to prev_blocks yet
-                current_prev_blocks = np.where(change_mask[:, None, :, None], blocks, prev_blocks)
+                # Fold the changed blocks into the previous state in place instead of allocating a new frame.
+                # Playback is sequential (see below), so the state always advances after the diff.
+                np.copyto(prev_blocks, blocks, where=change_mask[:, None, :, None])
+                current_prev_blocks = prev_blocks
 
             rows, cols = np.where(change_mask)
 
             buffer = bytearray()
 
             if len(rows) > 0:
-                changed_colors = blocks[rows, :, cols, :]
-                top_colors = changed_colors[:, 0, ::-1] 
-                bot_colors = changed_colors[:, 1, ::-1]
+                # Gather changed blocks with the boolean mask on a (Rows, Columns, 2, 3) view.
+                # A single masked gather in row-major order is cheaper than fancy indexing with two index arrays.
+                changed_colors = blocks.transpose(0, 2, 1, 3)[change_mask].astype(np.int32)
+
+                if palette_256:
+                    # Quantize each BGR channel to 6 levels and map to the 6x6x6 cube (indices 16-231)
+                    levels = changed_colors * 6 // 256
+                    packed_colors = 16 + 36 * levels[:, :, 2] + 6 * levels[:, :, 1] + levels[:, :, 0]
+                else:
+                    # Pack each BGR color into a single 0xRRGGBB int.
+                    # The Python loop then compares and looks up one int instead of three.
+                    packed_colors = (changed_colors[:, :, 2] << 16) | (changed_colors[:, :, 1] << 8) | changed_colors[:, :, 0]
+                top_colors = packed_colors[:, 0]
+                bot_colors = packed_colors[:, 1]
 
                 # Optimization: Vectorized check for solid blocks (Top Color == Bottom Color)
                 # This moves the comparison out of the slow Python loop
-                is_solid = np.all(top_colors == bot_colors, axis=1)
+                is_solid = top_colors == bot_colors
+
+                # Optimization: Vectorized cursor movement planning
+                # Compare every changed cell with its predecessor in one pass instead of
+                # tracking prev_x/prev_y in the Python loop. The first cell always moves absolutely.
+                move_kind = np.full(len(rows), MOVE_ABSOLUTE, dtype=np.int32)
+                skip = np.zeros(len(rows), dtype=np.int32)
+                same_row = rows[1:] == rows[:-1]
+                skip[1:] = cols[1:] - cols[:-1] - 1
+                starts_next_row = (rows[1:] == rows[:-1] + 1) & (cols[1:] == 0)
+                move_kind[1:][same_row] = MOVE_FORWARD
+                move_kind[1:][same_row & (skip[1:] == 0)] = MOVE_NONE
+                move_kind[1:][starts_next_row] = MOVE_NEWLINE
+
+                # Optimization: Run Coalescing
+                # Adjacent cells on the same row that look identical (same background, same kind of
+                # block and, for half blocks, same foreground) are written as one run of glyphs.
+                # A run ends wherever the cursor has to move or any visible attribute changes.
+                new_run = np.ones(len(rows), dtype=bool)
+                new_run[1:] = (
+                    (move_kind[1:] != MOVE_NONE)
+                    | (bot_colors[1:] != bot_colors[:-1])
+                    | (is_solid[1:] != is_solid[:-1])
+                    | (~is_solid[1:] & (top_colors[1:] != top_colors[:-1]))
+                )
+                run_starts = np.flatnonzero(new_run)
+                run_lengths = np.diff(np.append(run_starts, len(rows)))
 
                 # Force int32 to avoid float conversions and ensure fast Python int access
                 update_data = np.column_stack((
-                    cols, rows, 
-                    top_colors, bot_colors,
-                    is_solid # Add boolean flag as integer (0 or 1)
+                    cols[run_starts], rows[run_starts],
+                    top_colors[run_starts], bot_colors[run_starts],
+                    is_solid[run_starts], # Add boolean flag as integer (0 or 1)
+                    move_kind[run_starts],
+                    skip[run_starts],
+                    run_lengths
                 )).astype(np.int32)
 
                 # Optimization: REMOVED np.lexsort
@@ -111,13 +170,9 @@ def _video_producer_process(file_path: str, resolution: int,
                 # Convert to list for faster iteration in Python
                 updates_list = update_data.tolist()
 
-                # Initialize prev_y to -1 to detect the start of the frame
-                prev_y = -1
-                prev_x = -1
-                
                 # Optimization: Track previous color to avoid redundant ANSI codes
-                prev_r, prev_g, prev_b = -1, -1, -1
-                prev_r2, prev_g2, prev_b2 = -1, -1, -1
+                prev_fg = -1
+                prev_bg = -1
                 
                 # Local variable caching for speed
                 _extend = buffer.extend
@@ -125,52 +180,53 @@ def _video_producer_process(file_path: str, resolution: int,
                 _space_char = b' '
                 _newline_seq = b'\r\n'
                 
-                # Split format strings to allow independent updates
-                _fg_fmt = b'\x1b[38;2;%d;%d;%dm'
-                _bg_fmt = b'\x1b[48;2;%d;%d;%dm'
+                # Split sequence prefixes to allow independent updates.
+                # Channels are joined from the pre-encoded DEC table instead of formatting ints.
+                _join = b''.join
+                _dec = DEC
+                _fg_prefix = b'\x1b[38;2;'
+                _bg_prefix = b'\x1b[48;2;'
 
-                for row in updates_list:
-                    x, y = row[0], row[1]
-                    
+                # Unpack rows in the for statement: one UNPACK_SEQUENCE instead of eight subscripts
+                for x, y, fg, bg, solid_block, move, skip_cells, run_length in updates_list:
                     # Optimization: Efficient Moves
-                    # Added y > 0 check to prevent newline at (0,0) when starting from -1.
-                    # This forces an absolute move for the first line, ensuring correct alignment.
-                    if y == prev_y + 1 and x == 0 and y > 0:
+                    if move == MOVE_NEWLINE:
                         # If we are starting a new line at x=0, just send a newline (2 bytes)
                         _extend(_newline_seq)
-                    elif y != prev_y or x != prev_x + 1:
+                    elif move == MOVE_FORWARD:
+                        # Same row, jump over the unchanged cells relative to the cursor
+                        _extend(forward_sequences[skip_cells])
+                    elif move:
                         # Otherwise, use absolute positioning
                         _extend(move_sequences[y][x])
                     
-                    r, g, b = row[2], row[3], row[4]
-                    r2, g2, b2 = row[5], row[6], row[7]
-                    solid_block = row[8] # Retrieved from vectorized check
+                    if bg != prev_bg:
+                        if palette_256:
+                            _extend(bg_palette_sequences[bg])
+                        else:
+                            _extend(_join((_bg_prefix, _dec[bg >> 16], b';', _dec[(bg >> 8) & 0xFF], b';', _dec[bg & 0xFF], b'm')))
+                        prev_bg = bg
 
                     # Optimization: Solid Block Detection
                     if solid_block:
-                        if (r2 != prev_r2 or g2 != prev_g2 or b2 != prev_b2):
-                            _extend(_bg_fmt % (r2, g2, b2))
-                            prev_r2, prev_g2, prev_b2 = r2, g2, b2
-                        _extend(_space_char)
+                        _extend(_space_char * run_length)
                     else:
                         # Normal Half-Block
-                        if (r != prev_r or g != prev_g or b != prev_b):
-                            _extend(_fg_fmt % (r, g, b))
-                            prev_r, prev_g, prev_b = r, g, b
-                        
-                        if (r2 != prev_r2 or g2 != prev_g2 or b2 != prev_b2):
-                            _extend(_bg_fmt % (r2, g2, b2))
-                            prev_r2, prev_g2, prev_b2 = r2, g2, b2
+                        if fg != prev_fg:
+                            if palette_256:
+                                _extend(fg_palette_sequences[fg])
+                            else:
+                                _extend(_join((_fg_prefix, _dec[fg >> 16], b';', _dec[(fg >> 8) & 0xFF], b';', _dec[fg & 0xFF], b'm')))
+                            prev_fg = fg
                         
-                        _extend(_block_char)
-                    
-                    prev_x = x
-                    prev_y = y
+                        _extend(_block_char * run_length)
             
             # --- Shared Memory Transfer ---
             # Handle data larger than buffer size by chunking (though 64MB should be enough)
             total_len = len(buffer)
             sent_len = 0
+            # Slicing a memoryview is zero-copy, slicing the bytearray would copy each chunk first
+            buffer_view = memoryview(buffer)
             
             while sent_len < total_len or total_len == 0:
                 # Get a free buffer index (blocks if full)
@@ -183,7 +239,7 @@ def _video_producer_process(file_path: str, resolution: int,
                 if chunk_size > 0:
                     offset = idx * buffer_size
                     # Direct memory copy into shared buffer
-                    shm.buf[offset:offset+chunk_size] = buffer[sent_len:sent_len+chunk_size]
+                    shm.buf[offset:offset+chunk_size] = buffer_view[sent_len:sent_len+chunk_size]
                 
                 # Notify consumer that data is ready
                 # We send the chunk size. If it's a partial frame, the consumer just prints it.
@@ -197,6 +253,8 @@ def _video_producer_process(file_path: str, resolution: int,
                 if total_len == 0:
                     break
             
+            buffer_view.release()
+            
             # Wait for feedback from consumer
             # If consumer rendered the frame, we update prev_blocks.
             # If consumer skipped the frame, we keep old prev_blocks, so next diff is calculated against the old state.
@@ -211,17 +269,19 @@ def _video_producer_process(file_path: str, resolution: int,
         cap.release()
         ready_queue.put(None) # Signal EOF
         
-        # Allow time for the queue to flush to the pipe before process exit
+        # Wait for the queue's feeder thread to flush to the pipe before process exit
         # This prevents the "premature end" where buffered frames are lost when the process dies
-        time.sleep(0.5)
+        ready_queue.close()
+        ready_queue.join_thread()
         
         shm.close()
 
 class VideoDecoder:
-    def __init__(self, file_path: str, resolution: int, compression: int = 150):
+    def __init__(self, file_path: str, resolution: int, compression: int = 150, palette_256: bool = False):
         self.file_path = file_path
         self.resolution = resolution if resolution % 2 == 0 else resolution + 1
         self.compression = compression
+        self.palette_256 = palette_256
         
         # Open briefly to get metadata, then release.
         # The worker process will open its own handle.
@@ -270,7 +330,7 @@ class VideoDecoder:
             target=_video_producer_process,
             args=(self.file_path, self.resolution, 
                   self.shm.name, BUFFER_SIZE, 
-                  free_queue, self.ready_queue, self.compression),
+                  free_queue, self.ready_queue, self.compression, self.palette_256),
             daemon=False # Changed to False to ensure queue flushes before exit
         )
         self.producer_process.start()
@@ -284,16 +344,15 @@ class VideoDecoder:
                 idx, size = item
                 offset = idx * BUFFER_SIZE
                 
-                # Read directly from shared memory
-                # bytes() creates a copy, which is safe as we are about to release the buffer
-                data = bytes(self.shm.buf[offset:offset+size])
+                # Yield a view straight into shared memory instead of copying the frame out.
+                # The view is only valid until the consumer asks for the next frame:
+                # it is released when the generator resumes, before the slot is recycled.
+                with self.shm.buf[offset:offset+size] as data:
+                    yield data
                 
                 # Return buffer index to the free queue so producer can reuse it
                 free_queue.put(idx)
                 
-                # Yield data
-                yield data
-                
         finally:
             # Cleanup resources
             if self.producer_process.is_alive():